@@ -0,0 +1 @@
+"""Reproducible benchmarks and load test for latking_app (see bench/run.py)."""
@@ -0,0 +1,76 @@
+"""
+Synthetic datasets inside India's bounding box (reproducible with a seed).
+
+bbox এর কোণগুলো India র বাইরেও পড়ে, তাই কিছু point "outside" হবে –
+real upload এর মতোই inside/outside দুই রকম path চলে।
+"""
+
+import csv
+import io
+
+import numpy as np
+import geopandas as gpd
+import shapely
+
+# lat min/max, lon min/max
+INDIA_BBOX = (6.5, 35.7, 68.1, 97.4)
+
+
+def random_points(n, seed=42):
+    """(lats, lons) float64 array"""
+    rng = np.random.default_rng(seed)
+    lat_min, lat_max, lon_min, lon_max = INDIA_BBOX
+    lats = rng.uniform(lat_min, lat_max, n).round(6)
+    lons = rng.uniform(lon_min, lon_max, n).round(6)
+    return lats, lons
+
+
+def points_csv_bytes(n, seed=42):
+    """app এর CSV upload format (Lat, Lon + একটা attribute column)"""
+    lats, lons = random_points(n, seed)
+    out = io.StringIO()
+    wr = csv.writer(out)
+    wr.writerow(["Id", "Lat", "Lon", "Name"])
+    for i, (lat, lon) in enumerate(zip(lats.tolist(), lons.tolist())):
+        wr.writerow([i, lat, lon, f"site-{i}"])
+    return out.getvalue().encode("utf-8")
+
+
+def grid_polygons(rows=20, cols=20):
+    """bbox জুড়ে rows × cols আয়তক্ষেত্র – uploaded polygon layer এর stand-in"""
+    lat_min, lat_max, lon_min, lon_max = INDIA_BBOX
+    lat_step = (lat_max - lat_min) / rows
+    lon_step = (lon_max - lon_min) / cols
+
+    boxes = [
+        shapely.box(
+            lon_min + c * lon_step, lat_min + r * lat_step,
+            lon_min + (c + 1) * lon_step, lat_min + (r + 1) * lat_step
+        )
+        for r in range(rows) for c in range(cols)
+    ]
+    return gpd.GeoDataFrame(
+        {"cell": [f"r{r}c{c}" for r in range(rows) for c in range(cols)]},
+        geometry=boxes,
+        crs="EPSG:4326"
+    )
+
+
+def polygons_kml_bytes(rows=20, cols=20):
+    """grid_polygons এর একই আয়তক্ষেত্র KML Placemark হিসেবে – KML upload route এর input"""
+    gdf = grid_polygons(rows, cols)
+    placemarks = []
+    for name, geom in zip(gdf["cell"], gdf.geometry):
+        coords = " ".join(f"{x},{y}" for x, y in geom.exterior.coords)
+        placemarks.append(
+            f"<Placemark><name>{name}</name><Polygon><outerBoundaryIs><LinearRing>"
+            f"<coordinates>{coords}</coordinates>"
+            f"</LinearRing></outerBoundaryIs></Polygon></Placemark>"
+        )
+    kml = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<kml xmlns="http://www.opengis.net/kml/2.2"><Document>'
+        + "".join(placemarks)
+        + "</Document></kml>"
+    )
+    return kml.encode("utf-8")
@@ -0,0 +1,121 @@
+"""
+Concurrent load test – আসল HTTP server (werkzeug, threaded) এর বিরুদ্ধে।
+
+প্রতিটা virtual user:
+    signup → login (OTP email, SMTP stub থেকে পড়ি) → CSV upload → map (GET /) → buffer POI download
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from werkzeug.serving import make_server
+
+from bench import datasets
+from bench.micro import summarize
+
+STEPS = ("signup", "send_otp", "verify_otp", "upload_csv", "map", "poi_download")
+BENCH_PASSWORD = "Bench12345"
+
+
+def start_app_server(appmod):
+    server = make_server("127.0.0.1", 0, appmod.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run_user(base, smtp, user_no, csv_payload, iteration):
+    """একজন user এর পুরো scenario; return: {step: seconds} আর error list"""
+    phone = f"8{iteration:03d}{user_no:06d}"[:10]
+    email = f"bench{iteration}u{user_no}@gmail.com"
+    http = requests.Session()
+    timings = {}
+    errors = []
+
+    def step(name, fn, expect=(200, 302)):
+        started = time.perf_counter()
+        try:
+            resp = fn()
+            timings[name] = time.perf_counter() - started
+            if resp.status_code not in expect:
+                errors.append(f"{name}: HTTP {resp.status_code}")
+                return False
+            return True
+        except Exception as e:
+            errors.append(f"{name}: {e!r}")
+            return False
+
+    ok = step("signup", lambda: http.post(f"{base}/signup", data={
+        "phone": phone, "email": email, "password": BENCH_PASSWORD
+    }, allow_redirects=False))
+
+    ok = ok and step("send_otp", lambda: http.post(f"{base}/login", data={
+        "step": "send_otp", "email": email
+    }))
+
+    if ok:
+        try:
+            otp = smtp.wait_for_otp(email)
+        except TimeoutError as e:
+            errors.append(f"otp: {e}")
+            ok = False
+
+    ok = ok and step("verify_otp", lambda: http.post(f"{base}/login", data={
+        "step": "verify_otp", "email": email, "otp": otp
+    }, allow_redirects=False), expect=(302,))
+
+    ok = ok and step("upload_csv", lambda: http.post(
+        f"{base}/",
+        data={"form_type": "csv"},
+        files={"csv_file": ("points.csv", csv_payload, "text/csv")},
+    ))
+
+    ok = ok and step("map", lambda: http.get(f"{base}/"))
+
+    ok and step("poi_download", lambda: http.get(f"{base}/download_buffer_pois", params={
+        "lat": 22.57, "lon": 88.36, "radius_km": 5
+    }))
+
+    return timings, errors
+
+
+def run_load(appmod, stubs, users=8, iterations=2, csv_rows=1_000):
+    server, base = start_app_server(appmod)
+    smtp = stubs["smtp"]
+    csv_payload = datasets.points_csv_bytes(csv_rows, seed=11)
+
+    per_step = {name: [] for name in STEPS}
+    errors = []
+    scenarios = 0
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=users) as pool:
+            futures = [
+                pool.submit(run_user, base, smtp, u, csv_payload, it)
+                for it in range(iterations) for u in range(users)
+            ]
+            for fut in futures:
+                timings, errs = fut.result()
+                scenarios += 1
+                errors.extend(errs)
+                for name, seconds in timings.items():
+                    per_step[name].append(seconds)
+    finally:
+        server.shutdown()
+
+    wall = time.perf_counter() - started
+    return {
+        "users": users,
+        "iterations": iterations,
+        "csv_rows": csv_rows,
+        "scenarios": scenarios,
+        "wall_s": wall,
+        "scenarios_per_s": scenarios / wall if wall > 0 else None,
+        "errors": errors,
+        "steps": {
+            name: summarize(samples)
+            for name, samples in per_step.items() if samples
+        },
+    }
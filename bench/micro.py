@@ -0,0 +1,241 @@
+"""
+Microbenchmarks – Flask test client দিয়ে সরাসরি app এর ভিতরে, network ছাড়া।
+
+প্রতিটা benchmark এর result:
+    {"runs", "min_s", "median_s", "mean_s", "p95_s", "max_s", "ops", "ops_per_s", "errors"}
+"""
+
+import io
+import statistics
+import time
+
+from bench import datasets
+
+BENCH_PHONE = "9000000000"
+
+
+def summarize(samples, ops=1, errors=0):
+    samples = sorted(samples)
+    median = statistics.median(samples)
+    return {
+        "runs": len(samples),
+        "min_s": samples[0],
+        "median_s": median,
+        "mean_s": statistics.fmean(samples),
+        "p95_s": samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+        "max_s": samples[-1],
+        "ops": ops,
+        "ops_per_s": ops / median if median > 0 else None,
+        "errors": errors,
+    }
+
+
+def measure(fn, repeat=5, warmup=1, ops=1, setup=None):
+    """fn() কে repeat বার চালাই; fn False ফেরত দিলে error গুনি। setup() টাইমিং এর বাইরে।"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+
+    samples = []
+    errors = 0
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        ok = fn()
+        samples.append(time.perf_counter() - started)
+        if ok is False:
+            errors += 1
+    return summarize(samples, ops=ops, errors=errors)
+
+
+def reset_store(appmod):
+    """point store খালি করি – প্রতিটা benchmark একই অবস্থা থেকে শুরু হয়"""
+    appmod.points.clear()
+    appmod.point_counts.update(total=0, inside=0, outside=0)
+    appmod.point_filter_index.clear()
+    appmod.point_grid.clear()
+    appmod.point_grid.update(appmod.new_grid_index())
+    appmod.csv_headers.clear()
+    appmod.csv_rows.clear()
+
+
+def preload_points(appmod, n, seed=1):
+    lats, lons = datasets.random_points(n, seed)
+    appmod.add_points(lats, lons, appmod.inside_india_mask(lats, lons), "bulk")
+
+
+def logged_in_client(appmod):
+    client = appmod.app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_phone"] = BENCH_PHONE
+    return client
+
+
+def upload_csv(client, payload):
+    resp = client.post(
+        "/",
+        data={"form_type": "csv", "csv_file": (io.BytesIO(payload), "points.csv")},
+        content_type="multipart/form-data",
+    )
+    return resp.status_code == 200
+
+
+def upload_kml(client, payload):
+    resp = client.post(
+        "/",
+        data={"form_type": "kml", "kml_file": (io.BytesIO(payload), "layer.kml")},
+        content_type="multipart/form-data",
+    )
+    # error হলেও page 200 দেয় – convert সফল হলে তবেই session এ zip path থাকে
+    with client.session_transaction() as sess:
+        return resp.status_code == 200 and "kml_zip" in sess
+
+
+def get_ok(client, url):
+    resp = client.get(url)
+    _ = resp.data
+    return resp.status_code == 200
+
+
+# ===================== BENCHMARKS =====================
+
+def bench_india_check(appmod, n, repeat):
+    lats, lons = datasets.random_points(n, seed=3)
+    pairs = list(zip(lats.tolist(), lons.tolist()))
+
+    def scalar():
+        for lat, lon in pairs:
+            appmod.is_inside_india(lat, lon)
+
+    def vector():
+        appmod.inside_india_mask(lats, lons)
+
+    return {
+        f"is_inside_india_scalar_{n}": measure(scalar, repeat=repeat, ops=n),
+        f"inside_india_mask_vector_{n}": measure(vector, repeat=repeat, ops=n),
+    }
+
+
+def bench_csv_ingest(appmod, sizes, repeat):
+    results = {}
+    client = logged_in_client(appmod)
+
+    for n in sizes:
+        payload = datasets.points_csv_bytes(n, seed=5)
+        results[f"csv_ingest_{n}"] = measure(
+            lambda: upload_csv(client, payload),
+            setup=lambda: reset_store(appmod),
+            repeat=repeat if n <= 100_000 else 1,
+            warmup=1 if n <= 100_000 else 0,
+            ops=n,
+        )
+    return results
+
+
+def bench_index_render(appmod, sizes, repeat):
+    results = {}
+    client = logged_in_client(appmod)
+
+    for n in sizes:
+        reset_store(appmod)
+        preload_points(appmod, n)
+        results[f"index_render_{n}"] = measure(lambda: get_ok(client, "/"), repeat=repeat)
+    return results
+
+
+def bench_downloads(appmod, n_points, repeat):
+    """প্রতিটা download / export route – একই data set এ"""
+    client = logged_in_client(appmod)
+
+    reset_store(appmod)
+    upload_csv(client, datasets.points_csv_bytes(min(n_points, 10_000), seed=9))
+    preload_points(appmod, max(n_points - 10_000, 0))
+    appmod.set_uploaded_layer(datasets.grid_polygons())
+
+    routes = {
+        "download_all_csv": "/download_all_csv",
+        "download_wrong_csv": "/download_wrong_csv",
+        "download_shapefile_csv": "/download_shapefile_csv",
+        "download_points_join_csv": "/download_points_join_csv",
+        "download_buffer_pois": "/download_buffer_pois?lat=22.57&lon=88.36&radius_km=5",
+        "api_weather": "/api/weather?lat=22.57&lon=88.36",
+        "api_points_page": "/api/points?limit=100&sort=desc",
+        "layer_tile_z5_cached": "/tiles/layer/5/22/13.png",
+    }
+    for fmt in appmod.EXPORT_FORMATS:
+        routes[f"export_points_{fmt}"] = f"/export?dataset=points&format={fmt}"
+
+    results = {}
+    for name, url in routes.items():
+        results[f"{name}_{n_points}"] = measure(lambda: get_ok(client, url), repeat=repeat)
+
+    # প্রতিটা run এর আগে tile cache খালি – STRtree build + render এর আসল খরচ
+    results[f"layer_tile_z5_cold_{n_points}"] = measure(
+        lambda: get_ok(client, "/tiles/layer/5/22/13.png"),
+        setup=appmod.reset_tile_cache,
+        repeat=repeat,
+    )
+
+    # KML upload current layer বদলে দেয়, তাই সবার শেষে – upload একবার, টাইম শুধু zip download এর
+    if upload_kml(client, datasets.polygons_kml_bytes()):
+        results[f"download_kml_shapefile_{n_points}"] = measure(
+            lambda: get_ok(client, "/download_kml_shapefile"), repeat=repeat
+        )
+    else:
+        print("[bench] KML upload failed – download_kml_shapefile skipped", flush=True)
+    return results
+
+
+def bench_spatial_join(appmod, n, repeat):
+    """
+    spatial_join_points এর দুই branch একই data তে – in-process STRtree আর process pool।
+    n < JOIN_PROCESS_THRESHOLD হলে threshold নামিয়ে pool branch জোর করে চালাই।
+    """
+    reset_store(appmod)
+    preload_points(appmod, n, seed=13)
+    layer = datasets.grid_polygons()
+    big = n >= 1_000_000
+
+    saved_threshold = appmod.JOIN_PROCESS_THRESHOLD
+    results = {}
+    try:
+        appmod.JOIN_PROCESS_THRESHOLD = n + 1
+        results[f"spatial_join_serial_{n}"] = measure(
+            lambda: appmod.spatial_join_points(layer),
+            repeat=1 if big else repeat, warmup=0 if big else 1, ops=n,
+        )
+
+        appmod.JOIN_PROCESS_THRESHOLD = min(saved_threshold, n)
+        results[f"spatial_join_process_{n}"] = measure(
+            lambda: appmod.spatial_join_points(layer),
+            repeat=1 if big else repeat, warmup=0 if big else 1, ops=n,
+        )
+    finally:
+        appmod.JOIN_PROCESS_THRESHOLD = saved_threshold
+    return results
+
+
+def run_micro(appmod, quick=False, repeat=5):
+    if quick:
+        check_n, csv_sizes, index_sizes, download_n, join_n = 10_000, (10_000,), (1_000, 10_000), 20_000, 20_000
+    else:
+        check_n, csv_sizes, index_sizes, download_n, join_n = (
+            100_000, (10_000, 1_000_000), (1_000, 100_000), 100_000, 1_000_000
+        )
+
+    results = {}
+    steps = [
+        ("india_check", lambda: bench_india_check(appmod, check_n, repeat)),
+        ("csv_ingest", lambda: bench_csv_ingest(appmod, csv_sizes, repeat)),
+        ("index_render", lambda: bench_index_render(appmod, index_sizes, repeat)),
+        ("downloads", lambda: bench_downloads(appmod, download_n, repeat)),
+        ("spatial_join", lambda: bench_spatial_join(appmod, join_n, repeat)),
+    ]
+    for label, step in steps:
+        print(f"[bench] micro: {label}", flush=True)
+        results.update(step())
+
+    reset_store(appmod)
+    return results
@@ -0,0 +1,138 @@
+"""
+Benchmark runner.
+
+    python -m bench.run                       # full run → bench/results/<timestamp>.json
+    python -m bench.run --quick --skip-load   # ছোট dataset, শুধু micro
+    python -m bench.run compare OLD.json NEW.json
+
+সব upstream (SMTP, Open-Meteo, Overpass) local stub এ যায়, users.json এর বদলে temp file।
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def import_app(env):
+    """stub এর env বসিয়ে তারপর app import – module-level config import এর সময় পড়া হয়"""
+    os.environ.update(env)
+    os.environ.setdefault("USERS_FILE", os.path.join(tempfile.mkdtemp(), "users.json"))
+    import latking_app
+    return latking_app
+
+
+def run(args):
+    from bench import load, micro, stubs
+
+    stub_servers, env = stubs.start_stubs(latency=args.upstream_latency, poi_count=args.poi_count)
+    try:
+        appmod = import_app(env)
+
+        result = {
+            "meta": {
+                "started_at": datetime.now().isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "quick": args.quick,
+                "repeat": args.repeat,
+                "upstream_latency_s": args.upstream_latency,
+                "poi_count": args.poi_count,
+            }
+        }
+
+        if not args.skip_micro:
+            result["micro"] = micro.run_micro(appmod, quick=args.quick, repeat=args.repeat)
+
+        if not args.skip_load:
+            print("[bench] load test", flush=True)
+            result["load"] = load.run_load(
+                appmod, stub_servers,
+                users=args.users, iterations=args.iterations,
+                csv_rows=1_000 if args.quick else 10_000,
+            )
+    finally:
+        stubs.stop_stubs(stub_servers)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"[bench] results saved: {output}")
+
+
+def flatten(result):
+    """{name: median_s} – micro আর load step দুটোই"""
+    out = {name: r["median_s"] for name, r in result.get("micro", {}).items()}
+    for name, r in result.get("load", {}).get("steps", {}).items():
+        out[f"load:{name}"] = r["median_s"]
+    return out
+
+
+def compare(args):
+    with open(args.old, encoding="utf-8") as f:
+        old = flatten(json.load(f))
+    with open(args.new, encoding="utf-8") as f:
+        new = flatten(json.load(f))
+
+    width = max((len(n) for n in old.keys() | new.keys()), default=10)
+    print(f"{'benchmark':<{width}}  {'old (ms)':>10}  {'new (ms)':>10}  {'change':>8}")
+
+    for name in sorted(old.keys() | new.keys()):
+        a = old.get(name)
+        b = new.get(name)
+        a_ms = f"{a * 1000:.2f}" if a is not None else "-"
+        b_ms = f"{b * 1000:.2f}" if b is not None else "-"
+        change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else ""
+        print(f"{name:<{width}}  {a_ms:>10}  {b_ms:>10}  {change:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GeoPortal benchmark + load test")
+    sub = parser.add_subparsers(dest="command")
+
+    cmp_parser = sub.add_parser("compare", help="compare two result files")
+    cmp_parser.add_argument("old")
+    cmp_parser.add_argument("new")
+
+    parser.add_argument("--quick", action="store_true", help="small datasets (10k rows)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=2, help="scenarios per user")
+    parser.add_argument("--upstream-latency", type=float, default=0.0, help="stub delay in seconds")
+    parser.add_argument("--poi-count", type=int, default=2000, help="elements per Overpass stub reply")
+    parser.add_argument("--output", help="result JSON path")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        compare(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
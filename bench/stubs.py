@@ -0,0 +1,207 @@
+"""
+Local stand-ins for the upstream services the app talks to.
+
+- SMTP (OTP email)      : tiny ESMTP server, OTP গুলো memory তে রাখে
+- Open-Meteo            : /v1/forecast → fixed current_weather JSON
+- Overpass              : /api/interpreter → synthetic POI elements around the query center
+
+সব server 127.0.0.1 এর free port এ daemon thread এ চলে।
+"""
+
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ===================== SMTP STUB =====================
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        self.reply("220 bench-smtp ESMTP")
+        rcpts = []
+        data_lines = None
+
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                break
+
+            if data_lines is not None:
+                if raw in (b".\r\n", b".\n"):
+                    self.server.store("".join(data_lines), rcpts)
+                    data_lines = None
+                    self.reply("250 OK")
+                else:
+                    data_lines.append(raw.decode("utf-8", "replace"))
+                continue
+
+            cmd = raw.decode("ascii", "replace").strip()
+            verb = cmd.split(" ", 1)[0].upper()
+
+            if verb == "EHLO":
+                self.reply("250-bench-smtp")
+                self.reply("250 AUTH PLAIN")
+            elif verb == "HELO":
+                self.reply("250 bench-smtp")
+            elif verb == "AUTH":
+                self.reply("235 Authentication successful")
+            elif verb == "MAIL":
+                rcpts = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                m = re.search(r"<([^>]+)>", cmd)
+                if m:
+                    rcpts.append(m.group(1).lower())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                data_lines = []
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                break
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), _SMTPHandler)
+        self.otps = {}                  # email -> সর্বশেষ OTP
+        self.cond = threading.Condition()
+
+    def store(self, message, rcpts):
+        m = re.search(r"OTP is: (\d{6})", message)
+        if not m:
+            return
+        with self.cond:
+            for rcpt in rcpts:
+                self.otps[rcpt] = m.group(1)
+            self.cond.notify_all()
+
+    def wait_for_otp(self, email, timeout=10.0):
+        """email এ OTP আসা পর্যন্ত অপেক্ষা করি, তারপর সেটা নিয়ে নিই"""
+        email = email.lower()
+        with self.cond:
+            if not self.cond.wait_for(lambda: email in self.otps, timeout):
+                raise TimeoutError(f"No OTP received for {email}")
+            return self.otps.pop(email)
+
+
+# ===================== HTTP STUBS (Open-Meteo + Overpass) =====================
+
+class _UpstreamHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if not self.path.startswith("/v1/forecast"):
+            self.send_error(404)
+            return
+
+        time.sleep(self.server.latency)
+        self.send_json({
+            "current_weather": {
+                "temperature": 28.4,
+                "windspeed": 11.2,
+                "weathercode": 2,
+            }
+        })
+
+    def do_POST(self):
+        if not self.path.startswith("/api/interpreter"):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        query = self.rfile.read(length).decode("utf-8", "replace")
+
+        m = re.search(r"around:(\d+),([-\d.]+),([-\d.]+)", query)
+        radius_m, lat, lon = (int(m.group(1)), float(m.group(2)), float(m.group(3))) if m else (1000, 22.0, 80.0)
+
+        time.sleep(self.server.latency)
+        self.send_json({"elements": synthetic_elements(lat, lon, radius_m, self.server.poi_count)})
+
+
+def synthetic_elements(lat, lon, radius_m, count, seed=7):
+    """center এর চারপাশে Overpass এর মতো node/way element"""
+    rng = random.Random(seed)
+    spread = radius_m / 111_320.0
+    kinds = [("amenity", "school"), ("shop", "grocery"), ("railway", "station"),
+             ("highway", "bus_stop"), ("leisure", "playground"), ("natural", "water")]
+
+    elements = []
+    for i in range(count):
+        key, value = kinds[i % len(kinds)]
+        el_lat = lat + rng.uniform(-spread, spread)
+        el_lon = lon + rng.uniform(-spread, spread)
+        el = {"id": 1_000_000 + i, "tags": {key: value, "name": f"POI {i}"}}
+        if i % 3 == 0:
+            el.update(type="way", center={"lat": el_lat, "lon": el_lon})
+        else:
+            el.update(type="node", lat=el_lat, lon=el_lon)
+        elements.append(el)
+    return elements
+
+
+class UpstreamStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, poi_count=2000):
+        super().__init__((host, port), _UpstreamHandler)
+        self.latency = latency
+        self.poi_count = poi_count
+
+
+# ===================== START / STOP =====================
+
+def _serve(server):
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    return server
+
+
+def start_stubs(latency=0.0, poi_count=2000):
+    """
+    সব stub চালু করি।
+    return: (stubs dict, env dict) – env টা latking_app import এর আগে os.environ এ বসাতে হবে
+    """
+    smtp = _serve(SMTPStub())
+    upstream = _serve(UpstreamStub(latency=latency, poi_count=poi_count))
+
+    base = f"http://127.0.0.1:{upstream.server_address[1]}"
+    env = {
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(smtp.server_address[1]),
+        "SMTP_STARTTLS": "0",
+        "OPEN_METEO_URL": f"{base}/v1/forecast",
+        "OVERPASS_URL": f"{base}/api/interpreter",
+    }
+    return {"smtp": smtp, "upstream": upstream}, env
+
+
+def stop_stubs(stubs):
+    for server in stubs.values():
+        server.shutdown()
+        server.server_close()
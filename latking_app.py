@@ -1,10 +1,22 @@
 import os
 import re
+import math
 import csv
 import io
 import json
 import zipfile
-
+import shutil
+import hashlib
+import pickle
+import sys
+import threading
+import time
+import cProfile
+import multiprocessing
+from bisect import bisect_left
+from collections import OrderedDict
+
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 import tempfile
 import random
@@ -12,8 +24,16 @@ import smtplib
 from email.mime.text import MIMEText
 
 import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import requests
+import shapely
 from shapely.geometry import Point
+from PIL import Image, ImageDraw
 
 from flask import (
     Flask,
@@ -25,13 +45,364 @@ from flask import (
     session,
     jsonify,
     send_file,
+    g,
 )
 
 app = Flask(__name__)
 app.secret_key = "change_this_to_a_random_secret_key"
+
+# ===================== METRICS (Prometheus text format) =====================
+# ছোট in-process registry – প্রতি observe এ একটা lock + কয়েকটা dict lookup, production এ চালু রাখা যায়
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+# /metrics এ Bearer token লাগবে কিনা (ফাঁকা = খোলা)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+metrics_lock = threading.Lock()
+metric_defs = {}      # name -> (type, help, buckets)
+metric_values = {}    # name -> {label tuple: value | [bucket counts, sum, count]}
+
+
+def define_metric(name, kind, help_text, buckets=None):
+    metric_defs[name] = (kind, help_text, buckets)
+    metric_values[name] = {}
+
+
+def inc_counter(name, value=1, **labels):
+    key = tuple(sorted(labels.items()))
+    with metrics_lock:
+        series = metric_values[name]
+        series[key] = series.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    key = tuple(sorted(labels.items()))
+    with metrics_lock:
+        metric_values[name][key] = value
+
+
+def observe(name, value, **labels):
+    """Histogram এ একটা মান যোগ করি (bucket count গুলো render এর সময় cumulative হয়)"""
+    buckets = metric_defs[name][2]
+    key = tuple(sorted(labels.items()))
+    idx = bisect_left(buckets, value)
+    with metrics_lock:
+        series = metric_values[name]
+        rec = series.get(key)
+        if rec is None:
+            rec = series[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+        rec[0][idx] += 1
+        rec[1] += value
+        rec[2] += 1
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ""
+    parts = []
+    for k, v in pairs:
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def render_metrics():
+    lines = []
+    with metrics_lock:
+        snapshot = {
+            name: {k: (list(v[0]), v[1], v[2]) if isinstance(v, list) else v for k, v in series.items()}
+            for name, series in metric_values.items()
+        }
+
+    for name, (kind, help_text, buckets) in metric_defs.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+        for key, value in sorted(snapshot[name].items()):
+            if kind != "histogram":
+                lines.append(f"{name}{format_labels(key)} {value}")
+                continue
+
+            counts, total, count = value
+            running = 0
+            for le, c in zip(list(buckets) + ["+Inf"], counts):
+                running += c
+                lines.append(f"{name}_bucket{format_labels(key + (('le', le),))} {running}")
+            lines.append(f"{name}_sum{format_labels(key)} {total}")
+            lines.append(f"{name}_count{format_labels(key)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+define_metric("http_request_duration_seconds", "histogram",
+              "Request latency per Flask endpoint.", LATENCY_BUCKETS)
+define_metric("india_check_calls_total", "counter",
+              "Calls to the India boundary check (mode=scalar|vector).")
+define_metric("india_check_points_total", "counter",
+              "Points tested against the India boundary.")
+define_metric("india_check_duration_seconds", "histogram",
+              "Time spent in the India boundary check.", LATENCY_BUCKETS)
+define_metric("ingest_rows_total", "counter",
+              "Rows added to the point store by upload source.")
+define_metric("ingest_duration_seconds", "histogram",
+              "Time to parse, check and store one upload.", LATENCY_BUCKETS)
+define_metric("ingest_last_rows_per_second", "gauge",
+              "Throughput of the most recent upload by source.")
+define_metric("smtp_send_duration_seconds", "histogram",
+              "Time to send one OTP email.", LATENCY_BUCKETS)
+define_metric("upstream_request_duration_seconds", "histogram",
+              "Latency of Open-Meteo / Overpass calls.", LATENCY_BUCKETS)
+define_metric("upstream_response_bytes", "histogram",
+              "Payload size returned by Open-Meteo / Overpass.", SIZE_BUCKETS)
+define_metric("upstream_requests_total", "counter",
+              "Open-Meteo / Overpass calls by HTTP status.")
+
+
+def record_ingest(source, rows, seconds):
+    inc_counter("ingest_rows_total", rows, source=source)
+    observe("ingest_duration_seconds", seconds, source=source)
+    if seconds > 0:
+        set_gauge("ingest_last_rows_per_second", round(rows / seconds, 1), source=source)
+
+
+def record_upstream(upstream, resp, seconds):
+    """resp = None মানে timeout / connection error – status="error" হিসেবে গুনি"""
+    observe("upstream_request_duration_seconds", seconds, upstream=upstream)
+    if resp is None:
+        inc_counter("upstream_requests_total", upstream=upstream, status="error")
+        return
+    observe("upstream_response_bytes", len(resp.content), upstream=upstream)
+    inc_counter("upstream_requests_total", upstream=upstream, status=resp.status_code)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_latency(response):
+    started = g.get("request_started")
+    if started is not None and request.endpoint != "metrics":
+        observe(
+            "http_request_duration_seconds",
+            time.perf_counter() - started,
+            endpoint=request.endpoint or "unknown",
+            method=request.method,
+        )
+    return response
+
+
+@app.route("/metrics")
+def metrics():
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return "Unauthorized", 401
+
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ===================== ON-DEMAND REQUEST PROFILING =====================
+# চালু হয় দুইভাবে:
+#   1) admin user (ADMIN_PHONES) বা PROFILE_TOKEN সহ request এ "X-Profile: sample|cprofile" header
+#   2) PROFILE_SAMPLE_RATE (0..1) অনুযায়ী random request
+# sample = stack sampler → collapsed stack (flamegraph.pl / speedscope), cprofile = pstats ফাইল
+
+ADMIN_PHONES = {p.strip() for p in os.environ.get("ADMIN_PHONES", "").split(",") if p.strip()}
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0") or 0)
+PROFILE_DEFAULT_MODE = "sample"
+PROFILE_MODES = ("sample", "cprofile")
+PROFILE_INTERVAL = 0.005              # sampler প্রতি 5 ms এ stack নেয়
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+PROFILE_MAX_FILES = 50                # এর বেশি হলে পুরনো ফাইল মুছে যায়
+
+
+class StackSampler:
+    """একটা thread এর stack নির্দিষ্ট interval এ sample করে collapsed format এ গুনে রাখে"""
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        # প্রথম sample সাথে সাথেই – interval এর চেয়ে ছোট request ও খালি থাকে না
+        while True:
+            self.sample()
+            if self._stop.wait(self.interval):
+                break
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        key = ";".join(reversed(stack))
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.counts.items()))
+
+
+def is_admin():
+    return session.get("user_phone") in ADMIN_PHONES
+
+
+def can_profile():
+    """admin session অথবা X-Profile-Token – profile চালু আর profile file পড়া দুটোতেই একই check"""
+    token_ok = PROFILE_TOKEN and request.headers.get("X-Profile-Token") == PROFILE_TOKEN
+    return bool(token_ok) or is_admin()
+
+
+def requested_profile_mode():
+    """এই request profile হবে কিনা – হলে mode, নাহলে None"""
+    mode = request.headers.get("X-Profile", "").strip().lower()
+    if mode:
+        if can_profile():
+            return mode if mode in PROFILE_MODES else PROFILE_DEFAULT_MODE
+        return None
+
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return PROFILE_DEFAULT_MODE
+    return None
+
+
+def rotate_profiles():
+    files = sorted(
+        (os.path.join(PROFILE_DIR, f) for f in os.listdir(PROFILE_DIR)),
+        key=os.path.getmtime
+    )
+    for path in files[:-PROFILE_MAX_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def profile_file_name(mode):
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    endpoint = re.sub(r"[^A-Za-z0-9_]", "_", request.endpoint or "unknown")
+    ext = "pstats" if mode == "cprofile" else "collapsed"
+    return f"{stamp}_{endpoint}.{ext}"
+
+
+def save_profile(mode, profiler, name):
+    """profile file লিখি; sampler একটাও sample না পেলে False (file লিখি না)"""
+    if mode != "cprofile" and not profiler.counts:
+        return False
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+
+    if mode == "cprofile":
+        profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+    else:
+        with open(os.path.join(PROFILE_DIR, name), "w", encoding="utf-8") as f:
+            f.write(profiler.collapsed())
+
+    rotate_profiles()
+    return True
+
+
+@app.before_request
+def start_request_profile():
+    if request.endpoint in ("list_profiles", "download_profile", "metrics", "static"):
+        return
+
+    mode = requested_profile_mode()
+    if mode is None:
+        return
+
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = StackSampler(threading.get_ident())
+        profiler.start()
+
+    g.profile = (mode, profiler, profile_file_name(mode))
+
+
+@app.after_request
+def add_profile_header(response):
+    prof = g.get("profile")
+    if prof is not None:
+        response.headers["X-Profile-File"] = prof[2]
+    return response
+
+
+@app.teardown_request
+def finish_request_profile(exc):
+    """
+    teardown এ stop/save – exception হলেও চলে, তাই sampler thread leak হয় না
+    আর cProfile enabled থেকে যায় না
+    """
+    prof = g.pop("profile", None)
+    if prof is None:
+        return
+
+    mode, profiler, name = prof
+    if mode == "cprofile":
+        profiler.disable()
+    else:
+        profiler.stop()
+
+    try:
+        save_profile(mode, profiler, name)
+    except Exception as e:
+        print("Profile save error:", e)
+
+
+@app.route("/admin/profiles")
+def list_profiles():
+    if not can_profile():
+        return jsonify({"error": "Admin or profile token required"}), 403
+
+    if not os.path.isdir(PROFILE_DIR):
+        return jsonify({"profiles": []})
+
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        st = os.stat(os.path.join(PROFILE_DIR, name))
+        profiles.append({
+            "name": name,
+            "size": st.st_size,
+            "created_at": datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
+            "url": url_for("download_profile", name=name),
+        })
+    profiles.sort(key=lambda p: p["name"], reverse=True)
+    return jsonify({"profiles": profiles})
+
+
+@app.route("/admin/profiles/<name>")
+def download_profile(name):
+    if not can_profile():
+        return jsonify({"error": "Admin or profile token required"}), 403
+
+    # path traversal আটকাই
+    path = os.path.join(PROFILE_DIR, os.path.basename(name))
+    if os.path.basename(name) != name or not os.path.isfile(path):
+        return "Profile not found", 404
+
+    return send_file(path, as_attachment=True, download_name=name)
+
 # ===================== USER STORE (PERSISTENT) =====================
 
-USERS_FILE = "users.json"   # phone/email/password এই ফাইলে সেভ হবে
+USERS_FILE = os.environ.get("USERS_FILE", "users.json")   # phone/email/password এই ফাইলে সেভ হবে
 users = {}                  # key = phone, value = dict(phone, email, password)
 
 
@@ -65,8 +436,10 @@ load_users()
 
 otp_store = {}  # key = email.lower(), value = {"otp": "123456", "expires_at": datetime, "purpose": "login"/"reset"}
 
-SMTP_HOST = "smtp.gmail.com"
-SMTP_PORT = 587
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+# local/test SMTP server এ TLS না থাকলে SMTP_STARTTLS=0
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") != "0"
 
 # 🔴 এখানেই নিজের Gmail + App Password বসাবে
 # Gmail এ 2-Step Verification ON করে App Password জেনারেট করতে হবে
@@ -92,17 +465,21 @@ def send_otp_email(to_email, otp, purpose="login"):
     msg["From"] = SMTP_USER
     msg["To"] = to_email
 
+    started = time.perf_counter()
     try:
         server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
-        server.starttls()
+        if SMTP_STARTTLS:
+            server.starttls()
         server.login(SMTP_USER, SMTP_PASS)
         server.sendmail(SMTP_USER, to_email, msg.as_string())
         server.quit()
 
+        observe("smtp_send_duration_seconds", time.perf_counter() - started, result="ok")
         print(f"[EMAIL] OTP sent to {to_email}", flush=True)
         return True, None
 
     except Exception as e:
+        observe("smtp_send_duration_seconds", time.perf_counter() - started, result="error")
         # ইমেল গেলে না, অন্তত console এ OTP দেখাই
         print("=== SMTP ERROR while sending OTP ===", flush=True)
         print("Error:", repr(e), flush=True)
@@ -125,11 +502,23 @@ def get_user_by_email(email: str):
 
 # সব পয়েন্ট (inside + outside, manual + csv)
 points = []
+# running counter – প্রতি request এ পুরো list গুনতে হয় না
+point_counts = {"total": 0, "inside": 0, "outside": 0}
+# table filter index: (inside | None, source | None) -> বাড়তে থাকা position list
+point_filter_index = {}
 csv_headers = []
 csv_rows = []
 
 # shapefile থেকে আসা GeoJSON data (global)
 shapefile_geojson = None
+# একই GeoJSON এর serialized text – map বেশি zoom এ lazy fetch করে
+shapefile_geojson_text = None
+# [[min_lat, min_lon], [max_lat, max_lon]] – map fitBounds এর জন্য
+layer_bounds = None
+# একই layer এর GeoDataFrame (EPSG:4326) – export এর জন্য
+shapefile_gdf = None
+# প্রতি upload এ বাড়ে – tile cache invalidation + browser cache-busting
+layer_version = 0
 
 # ===== INDIA ADMIN BOUNDARY LOAD =====
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -145,13 +534,430 @@ india_polygon = india_gdf.union_all()
 # single polygon বানাই
 india_polygon = india_gdf.union_all()
 
+# bulk check এর জন্য prepared geometry
+shapely.prepare(india_polygon)
+
+# ===== ADMIN REGION INDEX (state / district) =====
+# india_boundary.zip এর পাশে রাখা admin layer গুলো – উপরের level আগে (country → state → district)
+# ADMIN_LAYERS env var এ একই format এ JSON দিয়ে override করা যায়
+ADMIN_LAYERS = [
+    {"level": "state", "path": "india_states.zip", "name_field": "ST_NM"},
+    {"level": "district", "path": "india_districts.zip", "name_field": "DISTRICT"},
+]
+if os.environ.get("ADMIN_LAYERS"):
+    ADMIN_LAYERS = json.loads(os.environ["ADMIN_LAYERS"])
+
+REGION_CACHE_DIR = os.path.join(BASE_DIR, "region_cache")
+
+# loaded layer: {"level", "names" (object array), "geoms", "tree"}
+region_layers = []
+
+
+def region_cache_path(layer_path, name_field):
+    """source ফাইলের path + mtime + size থেকে cache key – ফাইল বদলালে cache আপনা থেকেই বাতিল"""
+    st = os.stat(layer_path)
+    key = f"{os.path.abspath(layer_path)}|{st.st_mtime_ns}|{st.st_size}|{name_field}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(REGION_CACHE_DIR, f"{digest}.pkl")
+
+
+def load_region_layer(cfg):
+    """একটা admin layer লোড করি – disk cache (WKB) থাকলে shapefile আর পড়ি না"""
+    layer_path = os.path.join(BASE_DIR, cfg["path"])
+    if not os.path.exists(layer_path):
+        print(f"Admin layer not found, skipping {cfg['level']}: {layer_path}")
+        return None
+
+    cache_path = region_cache_path(layer_path, cfg["name_field"])
+    cached = None
+
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                cached = pickle.load(f)
+        except Exception as e:
+            print("Failed to load region cache:", e)
+
+    if cached is not None:
+        names = np.array(cached["names"], dtype=object)
+        geoms = shapely.from_wkb(np.array(cached["wkb"], dtype=object))
+    else:
+        # ভুল config (CRS নেই, name_field নেই, ভাঙা file) হলে app crash না করে layer বাদ দিই
+        try:
+            gdf = gpd.read_file(layer_path).to_crs("EPSG:4326")
+            names = gdf[cfg["name_field"]].astype(str).to_numpy(dtype=object)
+            geoms = shapely.make_valid(gdf.geometry.values)
+        except Exception as e:
+            print(f"Failed to load admin layer, skipping {cfg['level']}: {e!r}")
+            return None
+
+        try:
+            os.makedirs(REGION_CACHE_DIR, exist_ok=True)
+            with open(cache_path, "wb") as f:
+                pickle.dump({"names": names.tolist(), "wkb": shapely.to_wkb(geoms).tolist()}, f)
+        except Exception as e:
+            print("Failed to save region cache:", e)
+
+    shapely.prepare(geoms)
+    return {
+        "level": cfg["level"],
+        "names": names,
+        "geoms": geoms,
+        "tree": shapely.STRtree(geoms),
+    }
+
+
+for _cfg in ADMIN_LAYERS:
+    _layer = load_region_layer(_cfg)
+    if _layer is not None:
+        region_layers.append(_layer)
+
+# যে level গুলো সত্যিই লোড হয়েছে
+REGION_LEVELS = [layer["level"] for layer in region_layers]
+
+
+def query_prepared(tree, geoms, lats, lons, test_xy=shapely.contains_xy):
+    """
+    STRtree থেকে শুধু bbox candidate নিই, তারপর prepared polygon এর উপর test_xy
+    (contains_xy / intersects_xy) দিয়ে আসল check।
+    tree.query(..., predicate=...) দিলে point টাই prepared side হয়, polygon এর
+    prepare কাজে লাগে না – তাই predicate এখানে আলাদা করে চালাই।
+    return: (point index array, polygon index array)
+    """
+    in_idx, tree_idx = tree.query(shapely.points(lons, lats))
+    hit = test_xy(geoms[tree_idx], lons[in_idx], lats[in_idx])
+    return in_idx[hit], tree_idx[hit]
+
+
+def tag_regions(lats, lons, inside_mask):
+    """
+    Vectorized hierarchical lookup: India এর ভিতরের point → state → district।
+    প্রতিটা level এ শুধু আগের level এ মিল পাওয়া point গুলোই query হয়।
+    return: {level: object array (নাম বা None)}
+    """
+    n = len(lats)
+    result = {}
+    candidates = np.flatnonzero(inside_mask)
+
+    for layer in region_layers:
+        names = np.full(n, None, dtype=object)
+
+        if len(candidates):
+            in_idx, tree_idx = query_prepared(
+                layer["tree"], layer["geoms"], lats[candidates], lons[candidates]
+            )
+
+            # overlap থাকলে প্রথম polygon টাই নিই
+            matched, first = np.unique(in_idx, return_index=True)
+            names[candidates[matched]] = layer["names"][tree_idx[first]]
+
+            candidates = candidates[matched]
+
+        result[layer["level"]] = names
+
+    return result
+
 # ---------- Helper: India boundary check ----------
 def is_inside_india(lat, lon):
+    started = time.perf_counter()
     try:
         point = Point(lon, lat)
         return point.within(india_polygon)
     except:
         return False
+    finally:
+        inc_counter("india_check_calls_total", mode="scalar")
+        inc_counter("india_check_points_total", mode="scalar")
+        observe("india_check_duration_seconds", time.perf_counter() - started, mode="scalar")
+
+
+def inside_india_mask(lats, lons):
+    """
+    Vectorized version: lat/lon numpy array নিয়ে bool array ফেরত দেয়।
+    Point object বানায় না, সরাসরি coordinate array prepared polygon এ যায়।
+    """
+    started = time.perf_counter()
+    mask = shapely.contains_xy(india_polygon, lons, lats)
+
+    inc_counter("india_check_calls_total", mode="vector")
+    inc_counter("india_check_points_total", len(mask), mode="vector")
+    observe("india_check_duration_seconds", time.perf_counter() - started, mode="vector")
+    return mask
+
+
+# ---------- Helper: duplicate detection (grid hash) ----------
+EARTH_RADIUS_M = 6_371_000.0
+# distance_m এর একই radius থেকে – আলাদা হলে cell tolerance এর চেয়ে ছোট হয়ে 3×3 এ মিল হারায়
+METERS_PER_DEG = math.radians(1) * EARTH_RADIUS_M
+# cell কে tolerance এর চেয়ে সামান্য বড় রাখি – ঠিক সীমানার দূরত্বে float rounding এ cell না টপকায়
+DEDUP_CELL_SLACK = 1.001
+# tolerance অনুযায়ী cell এর মাপ (meter) – cell ≥ tolerance হলে পাশের 3×3 cell দেখলেই যথেষ্ট
+DEDUP_CELL_SIZES_M = (5.0, 10.0, 25.0, 50.0, 100.0)
+# এই latitude পর্যন্ত longitude দিকের cell ও অন্তত cell_m চওড়া (India পুরোটা ভিতরে)
+DEDUP_REF_LAT = 40.0
+MAX_DEDUP_TOLERANCE_M = DEDUP_CELL_SIZES_M[-1]
+DEDUP_MODES = ("off", "flag", "drop")
+
+
+def new_grid_index():
+    """
+    exact = (lat, lon) set, grids = cell_m → {grid cell → সেই cell এর coordinate list}।
+    দুটোই lazy – প্রথম dedup request এ তৈরি হয়, dedup না চাইলে ingest এ কোনো খরচ নেই।
+    """
+    return {"exact": None, "grids": {}}
+
+
+def grid_built(index):
+    return index["exact"] is not None or bool(index["grids"])
+
+
+def dedup_cell_size(tol_m):
+    return next(c for c in DEDUP_CELL_SIZES_M if c >= tol_m)
+
+
+def grid_cell(lat, lon, cell_m):
+    lat_deg = cell_m * DEDUP_CELL_SLACK / METERS_PER_DEG
+    lon_deg = lat_deg / math.cos(math.radians(DEDUP_REF_LAT))
+    return (math.floor(lon / lon_deg), math.floor(lat / lat_deg))
+
+
+def grid_cells(index, cell_m, coords=()):
+    """cell_m মাপের grid – প্রথমবার চাইলে coords থেকে তৈরি করি, তারপর grid_register এ আপডেট হয়"""
+    cells = index["grids"].get(cell_m)
+    if cells is None:
+        cells = index["grids"][cell_m] = {}
+        for lat, lon in coords:
+            cells.setdefault(grid_cell(lat, lon, cell_m), []).append((lat, lon))
+    return cells
+
+
+def grid_exact(index, coords=()):
+    """exact set – grid_cells এর মতোই প্রথমবার চাইলে coords থেকে তৈরি"""
+    if index["exact"] is None:
+        index["exact"] = set(coords)
+    return index["exact"]
+
+
+def grid_register(index, lat, lon):
+    """শুধু আগে থেকে তৈরি হওয়া index গুলোতেই যোগ করি"""
+    if index["exact"] is not None:
+        index["exact"].add((lat, lon))
+    for cell_m, cells in index["grids"].items():
+        cells.setdefault(grid_cell(lat, lon, cell_m), []).append((lat, lon))
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """ছোট দূরত্বের জন্য equirectangular approximation (meter)"""
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return EARTH_RADIUS_M * math.hypot(x, y)
+
+
+def grid_find(index, lat, lon, tol_m):
+    """
+    "exact" = একই coordinate আগে আছে (O(1) set lookup),
+    "near" = আশেপাশের cell এ tol_m এর মধ্যে কোনো point আছে, নাহলে None
+    """
+    if (lat, lon) in index["exact"]:
+        return "exact"
+    if tol_m <= 0:
+        return None
+
+    cell_m = dedup_cell_size(tol_m)
+    cx, cy = grid_cell(lat, lon, cell_m)
+    # DEDUP_REF_LAT এর উপরে longitude cell সরু হয়ে যায় – তখনই শুধু বেশি cell দেখি
+    lon_cell_m = (
+        cell_m * DEDUP_CELL_SLACK * math.cos(math.radians(lat)) / math.cos(math.radians(DEDUP_REF_LAT))
+    )
+    r_lon = max(1, math.ceil(tol_m / max(lon_cell_m, 1e-6)))
+
+    cells = index["grids"][cell_m]
+    for dx in range(-r_lon, r_lon + 1):
+        for dy in (-1, 0, 1):
+            for other_lat, other_lon in cells.get((cx + dx, cy + dy), ()):
+                if distance_m(lat, lon, other_lat, other_lon) <= tol_m:
+                    return "near"
+    return None
+
+
+# store এর সব point এর index – প্রথম dedup request এ তৈরি, তারপর add_point / add_points এ আপডেট হয়
+point_grid = new_grid_index()
+
+
+def find_duplicates(lats, lons, tol_m):
+    """
+    Upload batch এর প্রতিটা row store এর সাথে আর batch এর আগের row গুলোর সাথে মিলাই।
+    return: string array ("exact" / "near" / "" = unique)
+    """
+    batch_grid = new_grid_index()
+    grid_exact(point_grid, ((p["lat"], p["lon"]) for p in points))
+    grid_exact(batch_grid)
+    if tol_m > 0:
+        cell_m = dedup_cell_size(tol_m)
+        grid_cells(point_grid, cell_m, ((p["lat"], p["lon"]) for p in points))
+        grid_cells(batch_grid, cell_m)
+
+    flags = np.full(len(lats), "", dtype="<U5")
+
+    for i, (lat, lon) in enumerate(zip(lats.tolist(), lons.tolist())):
+        flag = grid_find(point_grid, lat, lon, tol_m) or grid_find(batch_grid, lat, lon, tol_m)
+        if flag:
+            flags[i] = flag
+        else:
+            grid_register(batch_grid, lat, lon)
+
+    return flags
+
+
+def read_dedup_options(form):
+    """upload form থেকে (mode, tolerance meter)"""
+    mode = form.get("dedup_mode", "off")
+    if mode not in DEDUP_MODES:
+        mode = "off"
+    try:
+        tol_m = float(form.get("dedup_tolerance_m", "0") or 0)
+    except ValueError:
+        tol_m = 0.0
+    if not math.isfinite(tol_m):
+        tol_m = 0.0
+    return mode, min(max(tol_m, 0.0), MAX_DEDUP_TOLERANCE_M)
+
+
+def dedup_message(flags, mode):
+    if flags is None:
+        return ""
+    exact = int(np.count_nonzero(flags == "exact"))
+    near = int(np.count_nonzero(flags == "near"))
+    action = "dropped" if mode == "drop" else "flagged"
+    return f", duplicates {action}: {exact} exact, {near} near"
+
+
+# ---------- Helper: point store ----------
+def now_str():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def index_positions(source, inside_positions, outside_positions):
+    """নতুন point এর position গুলো filter index এ যোগ করি (position সবসময় বাড়ে, তাই list sorted থাকে)"""
+    for inside, positions in ((True, inside_positions), (False, outside_positions)):
+        if positions:
+            point_filter_index.setdefault((inside, None), []).extend(positions)
+            point_filter_index.setdefault((inside, source), []).extend(positions)
+
+    merged = sorted(inside_positions + outside_positions)
+    point_filter_index.setdefault((None, source), []).extend(merged)
+
+
+def add_point(lat, lon, source, inside, created_at=None, **extra):
+    """
+    একটা point store এ যোগ করি, id দিই, counter আপডেট করি।
+    সব check আগে – store, grid, counter একসাথে আপডেট হয়, মাঝপথে fail করে না।
+    """
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        raise ValueError("Latitude/Longitude must be finite numbers")
+
+    rec = {
+        "id": len(points) + 1,
+        "lat": lat,
+        "lon": lon,
+        "source": source,
+        "inside": bool(inside),
+        "created_at": created_at or now_str(),
+    }
+    if region_layers:
+        tags = tag_regions(np.array([lat]), np.array([lon]), np.array([rec["inside"]]))
+        for level, names in tags.items():
+            rec[level] = names[0]
+
+    rec.update(extra)
+    points.append(rec)
+    grid_register(point_grid, lat, lon)
+
+    pos = rec["id"] - 1
+    if rec["inside"]:
+        index_positions(source, [pos], [])
+    else:
+        index_positions(source, [], [pos])
+
+    point_counts["total"] += 1
+    point_counts["inside" if rec["inside"] else "outside"] += 1
+    return rec
+
+
+def add_points(lats, lons, inside_mask, source, created_at=None, extra_columns=None):
+    """
+    Bulk version: numpy array থেকে একবারে অনেক point যোগ করি।
+    extra_columns = {key: list/array} – প্রতিটা point এ একই position এর মান বসে।
+    """
+    if not (np.isfinite(lats).all() and np.isfinite(lons).all()):
+        raise ValueError("Latitude/Longitude must be finite numbers")
+
+    created_at = created_at or now_str()
+    start_id = len(points) + 1
+
+    columns = dict(tag_regions(lats, lons, inside_mask)) if region_layers else {}
+    columns.update(extra_columns or {})
+    keys = list(columns)
+    values = [list(columns[k]) for k in keys]
+
+    points.extend(
+        {
+            "id": start_id + i,
+            "lat": lat,
+            "lon": lon,
+            "source": source,
+            "inside": inside,
+            "created_at": created_at,
+            **{k: v[i] for k, v in zip(keys, values)}
+        }
+        for i, (lat, lon, inside) in enumerate(zip(
+            lats.tolist(), lons.tolist(), inside_mask.tolist()
+        ))
+    )
+
+    # dedup index আগে তৈরি হয়ে থাকলে তবেই আপডেট – dedup ছাড়া ingest এ per-row loop নেই
+    if grid_built(point_grid):
+        for lat, lon in zip(lats.tolist(), lons.tolist()):
+            grid_register(point_grid, lat, lon)
+
+    positions = np.arange(start_id - 1, start_id - 1 + len(lats))
+    index_positions(source, positions[inside_mask].tolist(), positions[~inside_mask].tolist())
+
+    added = len(lats)
+    inside_count = int(inside_mask.sum())
+    point_counts["total"] += added
+    point_counts["inside"] += inside_count
+    point_counts["outside"] += added - inside_count
+    return added, added - inside_count
+
+
+# ---------- Helper: uploaded layer ----------
+def set_uploaded_layer(gdf):
+    """Shapefile/KML upload এর পর current layer সেট করি (GeoJSON + GeoDataFrame)"""
+    global shapefile_geojson, shapefile_geojson_text, shapefile_gdf, layer_bounds, layer_version
+
+    # ধীর কাজ (to_crs / to_json) আগে – এর মাঝে tile request পুরনো layer ই দেখে
+    geojson_text = geojson = bounds = None
+    if gdf is not None:
+        if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+            gdf = gdf.to_crs("EPSG:4326")
+
+        geojson_text = gdf.to_json()
+        geojson = json.loads(geojson_text)
+
+        min_lon, min_lat, max_lon, max_lat = gdf.total_bounds
+        if np.isfinite([min_lon, min_lat, max_lon, max_lat]).all():
+            bounds = [[float(min_lat), float(min_lon)], [float(max_lat), float(max_lon)]]
+
+    # layer swap, version bump আর cache reset একসাথে – পুরনো layer এর tile নতুন version এ cache হয় না
+    with tile_lock:
+        shapefile_gdf = gdf
+        shapefile_geojson = geojson
+        shapefile_geojson_text = geojson_text
+        layer_bounds = bounds
+        layer_version += 1
+        clear_tile_cache()
+
 # ---------- Helper: validation functions ----------
 def is_valid_phone(phone: str) -> bool:
     # ঠিক ১০ digit, শুধু সংখ্যা
@@ -379,12 +1185,102 @@ def forgot_password():
     return render_template("forgot_password.html", error=None, info=None, email="", otp_sent=False)
 
 
+# ===================== BULK POINT IMPORT (CSV / Parquet / XLSX / GeoJSON) =====================
+
+# auto-detect এর জন্য সম্ভাব্য column নাম (lowercase)
+LAT_COLUMN_NAMES = ("lat", "latitude", "lat_dd", "y")
+LON_COLUMN_NAMES = ("lon", "lng", "long", "longitude", "lon_dd", "x")
+
+BULK_EXTENSIONS = (".csv", ".parquet", ".xlsx", ".geojson", ".json")
+
+
+def find_column(columns, wanted, candidates):
+    """
+    user mapping থাকলে সেটা, নাহলে candidates থেকে প্রথম মিল (case-insensitive)
+    """
+    if wanted:
+        if wanted in columns:
+            return wanted
+        raise ValueError(f"Column not found: {wanted}")
+
+    lower = {c.lower().strip(): c for c in columns}
+    for name in candidates:
+        if name in lower:
+            return lower[name]
+    return None
+
+
+def column_to_float(table, name):
+    """Arrow column কে float64 numpy array বানাই; ভুল/ফাঁকা মান = NaN"""
+    col = table.column(name)
+    try:
+        col = pc.cast(col, pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return pd.to_numeric(col.to_pandas(), errors="coerce").to_numpy(dtype="float64")
+    return col.to_numpy(zero_copy_only=False)
+
+
+def read_bulk_coordinates(file, lat_col="", lon_col=""):
+    """
+    Upload ফাইল column-wise পড়ে (lats, lons) float64 array ফেরত দেয়।
+    CSV = multi-threaded Arrow reader, Parquet = pyarrow, XLSX = pandas (শুধু lat/lon coerce),
+    GeoJSON = pyogrio (Arrow) – lat/lon column না থাকলে point geometry থেকে নিই।
+    """
+    ext = os.path.splitext(file.filename)[1].lower()
+
+    if ext == ".csv":
+        table = pacsv.read_csv(
+            file.stream,
+            read_options=pacsv.ReadOptions(use_threads=True)
+        )
+    elif ext == ".parquet":
+        table = pq.read_table(io.BytesIO(file.read()))
+    elif ext == ".xlsx":
+        # পুরো sheet Arrow এ নিই না – অন্য column এ mixed type থাকলেও import চলবে
+        df = pd.read_excel(file.stream)
+        df.columns = [str(c) for c in df.columns]
+
+        lat_name = find_column(list(df.columns), lat_col, LAT_COLUMN_NAMES)
+        lon_name = find_column(list(df.columns), lon_col, LON_COLUMN_NAMES)
+        if not lat_name or not lon_name:
+            raise ValueError("Could not detect latitude/longitude columns.")
+
+        lats = pd.to_numeric(df[lat_name], errors="coerce").to_numpy(dtype="float64")
+        lons = pd.to_numeric(df[lon_name], errors="coerce").to_numpy(dtype="float64")
+        return lats, lons
+    elif ext in (".geojson", ".json"):
+        gdf = gpd.read_file(io.BytesIO(file.read()), engine="pyogrio", use_arrow=True)
+        if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+            gdf = gdf.to_crs("EPSG:4326")
+
+        columns = list(gdf.columns.drop(gdf.geometry.name))
+        # GeoJSON এ mapping দিলে তবেই column, নাহলে geometry
+        lat_name = find_column(columns, lat_col, ())
+        lon_name = find_column(columns, lon_col, ())
+        if lat_name and lon_name:
+            lats = pd.to_numeric(gdf[lat_name], errors="coerce").to_numpy(dtype="float64")
+            lons = pd.to_numeric(gdf[lon_name], errors="coerce").to_numpy(dtype="float64")
+        else:
+            # non-point geometry হলে get_x/get_y NaN দেয়
+            geoms = gdf.geometry.values
+            lats = shapely.get_y(geoms)
+            lons = shapely.get_x(geoms)
+        return lats, lons
+    else:
+        raise ValueError("Unsupported file type. Use: " + ", ".join(BULK_EXTENSIONS))
+
+    lat_name = find_column(table.column_names, lat_col, LAT_COLUMN_NAMES)
+    lon_name = find_column(table.column_names, lon_col, LON_COLUMN_NAMES)
+    if not lat_name or not lon_name:
+        raise ValueError("Could not detect latitude/longitude columns.")
+
+    return column_to_float(table, lat_name), column_to_float(table, lon_name)
+
+
 # ===================== MAIN DASHBOARD =====================
 
 @app.route("/", methods=["GET", "POST"])
 def index():
-    global shapefile_geojson
-
     # auth check
     if "user_phone" not in session:
         return redirect(url_for("login"))
@@ -408,16 +1304,12 @@ def index():
                 try:
                     lat = float(lat_str)
                     lon = float(lon_str)
+                    if not (math.isfinite(lat) and math.isfinite(lon)):
+                        raise ValueError("non-finite coordinate")
 
                     inside = is_inside_india(lat, lon)
 
-                    points.append({
-                        "lat": lat,
-                        "lon": lon,
-                        "source": "input",
-                        "inside": inside,
-                        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    })
+                    add_point(lat, lon, "input", inside)
 
                     message = "Inside India" if inside else "Outside India (saved)"
 
@@ -433,6 +1325,7 @@ def index():
 
             else:
                 try:
+                    ingest_started = time.perf_counter()
                     decoded = file.read().decode("utf-8")
                     rdr = csv.DictReader(io.StringIO(decoded))
 
@@ -440,9 +1333,8 @@ def index():
                     csv_rows.clear()
                     csv_headers.extend(rdr.fieldnames)
 
-                    total = 0
-                    added = 0
-                    outside_count = 0
+                    lat_list = []
+                    lon_list = []
 
                     for row in rdr:
                         try:
@@ -450,30 +1342,101 @@ def index():
                             lon = float(row["Lon"])
                         except:
                             continue
+                        # "nan" / "inf" ও float() এ পার হয়ে যায়
+                        if not (math.isfinite(lat) and math.isfinite(lon)):
+                            continue
 
-                        total += 1
-                        inside = is_inside_india(lat, lon)
-
-                        points.append({
-                            "lat": lat,
-                            "lon": lon,
-                            "source": "csv",
-                            "inside": inside,
-                            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            "row_index": len(csv_rows)
-                        })
-
+                        lat_list.append(lat)
+                        lon_list.append(lon)
                         csv_rows.append(row)
 
-                        added += 1
-                        if not inside:
-                            outside_count += 1
-
-                    message = f"CSV rows: {total}, added: {added}, outside India: {outside_count}"
+                    lats = np.array(lat_list, dtype="float64")
+                    lons = np.array(lon_list, dtype="float64")
+                    total = len(lats)
+
+                    # duplicate / near-duplicate check
+                    dedup_mode, dedup_tol = read_dedup_options(request.form)
+                    flags = None
+                    extra_columns = {}
+
+                    if dedup_mode != "off":
+                        flags = find_duplicates(lats, lons, dedup_tol)
+                        if dedup_mode == "drop":
+                            keep = flags == ""
+                            lats = lats[keep]
+                            lons = lons[keep]
+                            csv_rows[:] = [r for r, k in zip(csv_rows, keep.tolist()) if k]
+                        else:
+                            extra_columns["duplicate"] = flags.tolist()
+
+                    extra_columns["row_index"] = range(len(lats))
+
+                    # containment + region tagging পুরো batch এ একবারে
+                    inside_mask = inside_india_mask(lats, lons)
+                    added, outside_count = add_points(
+                        lats, lons, inside_mask, "csv",
+                        extra_columns=extra_columns
+                    )
+
+                    record_ingest("csv", added, time.perf_counter() - ingest_started)
+
+                    message = (
+                        f"CSV rows: {total}, added: {added}, outside India: {outside_count}"
+                        + dedup_message(flags, dedup_mode)
+                    )
 
                 except Exception as e:
                     print("CSV Error:", e)
                     message = "CSV file read error."
+        # ------------------ BULK IMPORT (CSV / Parquet / XLSX / GeoJSON) ------------------
+        elif form_type == "bulk":
+            file = request.files.get("bulk_file")
+            lat_col = request.form.get("lat_col", "").strip()
+            lon_col = request.form.get("lon_col", "").strip()
+
+            if not file or file.filename == "":
+                message = "Please select a file."
+
+            else:
+                try:
+                    ingest_started = time.perf_counter()
+                    lats, lons = read_bulk_coordinates(file, lat_col, lon_col)
+                    total = len(lats)
+
+                    valid = np.isfinite(lats) & np.isfinite(lons)
+                    lats = lats[valid]
+                    lons = lons[valid]
+
+                    dedup_mode, dedup_tol = read_dedup_options(request.form)
+                    flags = None
+                    extra_columns = {}
+
+                    if dedup_mode != "off":
+                        flags = find_duplicates(lats, lons, dedup_tol)
+                        if dedup_mode == "drop":
+                            keep = flags == ""
+                            lats = lats[keep]
+                            lons = lons[keep]
+                        else:
+                            extra_columns["duplicate"] = flags.tolist()
+
+                    inside_mask = inside_india_mask(lats, lons)
+                    added, outside_count = add_points(
+                        lats, lons, inside_mask, "bulk",
+                        extra_columns=extra_columns
+                    )
+
+                    record_ingest("bulk", added, time.perf_counter() - ingest_started)
+
+                    message = (
+                        f"Bulk rows: {total}, added: {added}, outside India: {outside_count}"
+                        + dedup_message(flags, dedup_mode)
+                    )
+
+                except Exception as e:
+                    print("Bulk import error:", e)
+                    message = f"Bulk import error: {e}"
+
                # ------------------ SHAPEFILE UPLOAD (ZIP) ------------------
         elif form_type == "shapefile":
             file = request.files.get("shapefile")
@@ -492,7 +1455,7 @@ def index():
 
                     gdf = gpd.read_file(tmp_path)
 
-                    shapefile_geojson = json.loads(gdf.to_json())
+                    set_uploaded_layer(gdf)
 
                     message = f"""
                     Shapefile loaded successfully. Features: {len(gdf)} <br>
@@ -503,7 +1466,7 @@ def index():
 
                 except Exception as e:
                     print("Shapefile Error:", e)
-                    shapefile_geojson = None
+                    set_uploaded_layer(None)
                     message = "Error reading shapefile."
 
                 finally:
@@ -538,7 +1501,7 @@ def index():
                     else:
 
                         # Show on Map
-                        shapefile_geojson = json.loads(gdf.to_json())
+                        set_uploaded_layer(gdf)
 
                         # Convert to Shapefile
                         shp_folder = os.path.join(tmp_dir, "shp")
@@ -589,11 +1552,6 @@ def index():
                     print("KML ERROR:", e)
                     message = str(e)
 
-    # outside India points
-    outside_points = [p for p in points if not p["inside"]]
-    points_json = json.dumps(points)
-    shapefile_json = json.dumps(shapefile_geojson) if shapefile_geojson is not None else "null"
-
     # phone number mask
     phone = session.get("user_phone")
     if phone and len(phone) >= 5:
@@ -606,13 +1564,152 @@ def index():
         message=message,
         last_lat=last_lat,
         last_lon=last_lon,
-        points=points,
-        outside_points=outside_points,
-        points_json=points_json,
-        shapefile_json=shapefile_json,
+        point_counts=point_counts,
+        has_layer=shapefile_gdf is not None,
+        layer_bounds=json.dumps(layer_bounds),
+        layer_version=layer_version,
+        raster_max_zoom=RASTER_MAX_ZOOM,
         user_phone=phone,
         masked_phone=masked_phone
     )
+# ===================== INCREMENTAL POINT API (AJAX) =====================
+
+MAX_POINTS_PER_REQUEST = 1000
+
+
+@app.route("/api/points", methods=["POST"])
+def api_add_points():
+    """
+    JSON body: {"lat": .., "lon": ..}  অথবা  {"points": [{"lat": .., "lon": ..}, ...]}
+    শুধু নতুন record + updated counter ফেরত দেয় – পুরো page আবার render হয় না
+    """
+    if "user_phone" not in session:
+        return jsonify({"error": "Login required"}), 401
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "JSON body required"}), 400
+
+    items = data.get("points")
+    if items is None:
+        items = [data]
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "points must be a non-empty list"}), 400
+
+    if len(items) > MAX_POINTS_PER_REQUEST:
+        return jsonify({
+            "error": f"At most {MAX_POINTS_PER_REQUEST} points per request"
+        }), 400
+
+    lats = []
+    lons = []
+    errors = []
+
+    for i, item in enumerate(items):
+        try:
+            raw_lat, raw_lon = item["lat"], item["lon"]
+            # JSON true/false float() এ 1.0/0.0 হয়ে যায় – coordinate নয়
+            if isinstance(raw_lat, bool) or isinstance(raw_lon, bool):
+                raise ValueError("boolean coordinate")
+            lat = float(raw_lat)
+            lon = float(raw_lon)
+            if not (math.isfinite(lat) and math.isfinite(lon)):
+                raise ValueError("non-finite coordinate")
+        except Exception:
+            errors.append({"index": i, "error": "Latitude/Longitude must be numeric"})
+            continue
+
+        lats.append(lat)
+        lons.append(lon)
+
+    # valid point গুলো একবারে – একটা India check আর একটা region query
+    added = []
+    if lats:
+        lats = np.array(lats, dtype="float64")
+        lons = np.array(lons, dtype="float64")
+        start = len(points)
+        add_points(lats, lons, inside_india_mask(lats, lons), "input")
+        added = points[start:]
+
+    status = 200 if added else 400
+    return jsonify({
+        "added": added,
+        "errors": errors,
+        "counts": point_counts
+    }), status
+
+
+# ===================== PAGINATED POINT TABLE API =====================
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+@app.route("/api/points", methods=["GET"])
+def api_list_points():
+    """
+    Keyset pagination: /api/points?after=<id>&limit=100&sort=asc|desc&inside=yes|no&source=csv
+    id গুলো created order এ বাড়ে আর id = list position + 1। Filter থাকলে point_filter_index
+    এর sorted position list এ bisect করি – filter যত selective আর page যত গভীরই হোক,
+    প্রতি page এ শুধু limit টা row ছুঁই।
+    """
+    if "user_phone" not in session:
+        return jsonify({"error": "Login required"}), 401
+
+    after = request.args.get("after", type=int)
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    sort = request.args.get("sort", "asc")
+    inside_filter = request.args.get("inside", "")
+    source_filter = request.args.get("source", "")
+
+    if sort not in ("asc", "desc"):
+        return jsonify({"error": "sort must be 'asc' or 'desc'"}), 400
+    if inside_filter not in ("", "yes", "no"):
+        return jsonify({"error": "inside must be 'yes' or 'no'"}), 400
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    inside_key = (inside_filter == "yes") if inside_filter else None
+    source_key = source_filter or None
+
+    if inside_key is None and source_key is None:
+        candidates = range(len(points))
+    else:
+        candidates = point_filter_index.get((inside_key, source_key), [])
+
+    # cursor id = position + 1; limit + 1 টা নিই যাতে পরের page আছে কিনা জানা যায়
+    if sort == "asc":
+        start = bisect_left(candidates, after) if after is not None else 0
+        page = candidates[start:start + limit + 1]
+    else:
+        end = bisect_left(candidates, after - 1) if after is not None else len(candidates)
+        page = candidates[max(end - limit - 1, 0):end][::-1]
+
+    has_more = len(page) > limit
+    items = []
+
+    for pos in page[:limit]:
+        p = points[pos]
+        items.append({
+            "id": p["id"],
+            "lat": p["lat"],
+            "lon": p["lon"],
+            "inside": p["inside"],
+            "source": p["source"],
+            "created_at": p["created_at"],
+        })
+
+    # আরও row আছে → শেষ item এর id ই পরের cursor
+    next_cursor = items[-1]["id"] if has_more else None
+
+    return jsonify({
+        "items": items,
+        "next_cursor": next_cursor,
+        "counts": point_counts
+    })
+
+
 @app.route("/download_kml_shapefile")
 def download_kml_shapefile():
 
@@ -638,7 +1735,10 @@ def download_all_csv():
 
     out = io.StringIO()
     wr = csv.writer(out)
-    wr.writerow(["Index", "Latitude", "Longitude", "InsideIndia", "Created", "Source"])
+    wr.writerow(
+        ["Index", "Latitude", "Longitude", "InsideIndia", "Created", "Source"]
+        + [level.title() for level in REGION_LEVELS]
+    )
 
     for i, p in enumerate(points, start=1):
         wr.writerow([
@@ -648,7 +1748,7 @@ def download_all_csv():
             "Yes" if p["inside"] else "No",
             p["created_at"],
             p["source"]
-        ])
+        ] + [p.get(level) or "" for level in REGION_LEVELS])
 
     return Response(
         out.getvalue(),
@@ -662,20 +1762,24 @@ def download_shapefile_csv():
     if "user_phone" not in session:
         return redirect(url_for("login"))
 
-    global shapefile_geojson
+    # একটাই snapshot – attribute আর join দুটোই একই layer থেকে, মাঝে re-upload হলেও
+    with tile_lock:
+        gdf = shapefile_gdf
 
-    if not shapefile_geojson:
+    if gdf is None:
         return "No shapefile loaded"
 
     try:
-        gdf = gpd.GeoDataFrame.from_features(shapefile_geojson["features"])
+        # geometry বাদ দিয়ে শুধু attribute
+        attrs = pd.DataFrame(gdf.drop(columns=gdf.geometry.name))
 
-        # geometry বাদ দিয়ে শুধু attribute
-        if "geometry" in gdf.columns:
-            gdf = gdf.drop(columns="geometry")
+        # প্রতিটা polygon এ কয়টা point পড়েছে
+        if points:
+            _, poly_idx = spatial_join_points(gdf)
+            attrs["point_count"] = np.bincount(poly_idx, minlength=len(gdf))
 
         out = io.StringIO()
-        gdf.to_csv(out, index=False)
+        attrs.to_csv(out, index=False)
 
         return Response(
             out.getvalue(),
@@ -718,8 +1822,439 @@ def download_wrong_csv():
     )
 
 
+# ===================== RASTER TILES FOR UPLOADED LAYER (z/x/y PNG) =====================
+
+TILE_SIZE = 256
+RASTER_MAX_ZOOM = 11                  # এই zoom পর্যন্ত PNG tile, তার উপরে GeoJSON vector
+TILE_MEMORY_CACHE_SIZE = 512          # memory LRU তে কয়টা tile
+TILE_CACHE_DIR = os.path.join(BASE_DIR, "tile_cache")
+
+TILE_FILL = (22, 163, 74, 20)         # GeoJSON style এর মতো (#16a34a, fillOpacity 0.08)
+TILE_STROKE = (22, 163, 74, 255)
+
+tile_memory_cache = OrderedDict()     # (version, z, x, y) -> PNG bytes
+tile_lock = threading.Lock()
+# (layer_version, STRtree, geometry array) – প্রথম tile request এ তৈরি হয়
+tile_tree = None
+
+
+def clear_tile_cache():
+    """memory + disk দুই cache ই ফেলে দিই – caller tile_lock ধরে রাখে"""
+    global tile_tree
+    tile_memory_cache.clear()
+    tile_tree = None
+    shutil.rmtree(TILE_CACHE_DIR, ignore_errors=True)
+
+
+def reset_tile_cache():
+    with tile_lock:
+        clear_tile_cache()
+
+
+def get_tile_tree():
+    """(layer_version, STRtree, geoms) – layer না থাকলে None"""
+    global tile_tree
+    with tile_lock:
+        if shapefile_gdf is None:
+            return None
+        if tile_tree is None or tile_tree[0] != layer_version:
+            geoms = np.asarray(shapefile_gdf.geometry.values, dtype=object)
+            shapely.prepare(geoms)
+            tile_tree = (layer_version, shapely.STRtree(geoms), geoms)
+        return tile_tree
+
+
+def tile_bounds(z, x, y):
+    """Web Mercator tile → (min_lon, min_lat, max_lon, max_lat)"""
+    n = 2 ** z
+
+    def lat_at(ty):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return (x / n * 360.0 - 180.0, lat_at(y + 1), (x + 1) / n * 360.0 - 180.0, lat_at(y))
+
+
+def to_tile_pixels(coords, z, x, y):
+    """lon/lat coordinate array → tile এর pixel (x, y) list"""
+    n = 2 ** z * TILE_SIZE
+    lon = coords[:, 0]
+    lat = np.radians(np.clip(coords[:, 1], -85.0511, 85.0511))
+    px = (lon + 180.0) / 360.0 * n - x * TILE_SIZE
+    py = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / math.pi) / 2 * n - y * TILE_SIZE
+    return list(zip(px.tolist(), py.tolist()))
+
+
+def render_tile(tree, geoms, z, x, y):
+    """STRtree দিয়ে শুধু এই tile এর সাথে intersect করা feature গুলো আঁকি"""
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+
+    # ধারে stroke কেটে না যায় তাই একটু বড় bbox
+    pad = (max_lon - min_lon) * 0.02
+    bbox = (min_lon - pad, min_lat - pad, max_lon + pad, max_lat + pad)
+    pixel_deg = (max_lon - min_lon) / TILE_SIZE
+
+    img = Image.new("RGBA", (TILE_SIZE, TILE_SIZE), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+
+    hits = tree.query(shapely.box(*bbox), predicate="intersects")
+    if len(hits):
+        clipped = shapely.clip_by_rect(geoms[hits], *bbox)
+        clipped = shapely.simplify(clipped, pixel_deg / 2)
+
+        for part in shapely.get_parts(clipped[~shapely.is_empty(clipped)]):
+            kind = shapely.get_type_id(part)
+
+            if kind == 3:  # Polygon
+                draw.polygon(to_tile_pixels(shapely.get_coordinates(part.exterior), z, x, y), fill=TILE_FILL)
+                for ring in part.interiors:
+                    draw.polygon(to_tile_pixels(shapely.get_coordinates(ring), z, x, y), fill=(0, 0, 0, 0))
+                for ring in [part.exterior, *part.interiors]:
+                    draw.line(to_tile_pixels(shapely.get_coordinates(ring), z, x, y), fill=TILE_STROKE, width=1)
+
+            elif kind in (1, 2):  # LineString / LinearRing
+                draw.line(to_tile_pixels(shapely.get_coordinates(part), z, x, y), fill=TILE_STROKE, width=2)
+
+            elif kind == 0:  # Point
+                (px, py), = to_tile_pixels(shapely.get_coordinates(part), z, x, y)
+                draw.ellipse((px - 2, py - 2, px + 2, py + 2), fill=TILE_STROKE)
+
+    out = io.BytesIO()
+    img.save(out, format="PNG", optimize=False)
+    return out.getvalue()
+
+
+@app.route("/tiles/layer/<int:z>/<int:x>/<int:y>.png")
+def layer_tile(z, x, y):
+    """Uploaded layer এর PNG tile – memory LRU → disk cache → render"""
+    if "user_phone" not in session:
+        return redirect(url_for("login"))
+
+    if z < 0 or z > RASTER_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return "Tile out of range", 404
+
+    with tile_lock:
+        if shapefile_gdf is None:
+            return "No shapefile loaded", 404
+        version = layer_version
+        key = (version, z, x, y)
+        png = tile_memory_cache.get(key)
+        if png is not None:
+            tile_memory_cache.move_to_end(key)
+
+    if png is None:
+        disk_path = os.path.join(TILE_CACHE_DIR, str(version), str(z), str(x), f"{y}.png")
+
+        if os.path.exists(disk_path):
+            with open(disk_path, "rb") as f:
+                png = f.read()
+        else:
+            snapshot = get_tile_tree()
+            if snapshot is None:
+                return "No shapefile loaded", 404
+
+            tree_version, tree, geoms = snapshot
+            png = render_tile(tree, geoms, z, x, y)
+
+            # এর মাঝে নতুন upload হলে এই tile আর কোনো cache এ রাখি না
+            if tree_version != version:
+                return Response(png, mimetype="image/png", headers={"Cache-Control": "no-store"})
+
+            try:
+                os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+                with open(disk_path, "wb") as f:
+                    f.write(png)
+            except OSError as e:
+                print("Tile cache write error:", e)
+
+        with tile_lock:
+            if version == layer_version:
+                tile_memory_cache[key] = png
+                if len(tile_memory_cache) > TILE_MEMORY_CACHE_SIZE:
+                    tile_memory_cache.popitem(last=False)
+
+    return Response(
+        png,
+        mimetype="image/png",
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
+
+
+@app.route("/api/layer.geojson")
+def layer_geojson():
+    """বেশি zoom এ vector layer – map শুধু RASTER_MAX_ZOOM এর উপরে গেলে fetch করে"""
+    if "user_phone" not in session:
+        return redirect(url_for("login"))
+
+    with tile_lock:
+        text = shapefile_geojson_text
+
+    if text is None:
+        return "No shapefile loaded", 404
+
+    return Response(
+        text,
+        mimetype="application/geo+json",
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
+
+
+# ===================== SPATIAL JOIN (points × uploaded polygon layer) =====================
+
+JOIN_CHUNK_SIZE = 250_000             # process pool এ প্রতি task এ এত point
+JOIN_PROCESS_THRESHOLD = 1_000_000    # এর বেশি point হলে process pool
+JOIN_WORKERS = os.cpu_count() or 2
+# threaded server থেকে fork করলে sampler/server thread এর lock সহ process copy হয় – তাই fork নয়
+JOIN_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# worker process এর (tree, prepared geoms) – initializer এ একবার তৈরি হয়
+_join_tree = None
+
+
+def build_join_tree(geoms):
+    """Polygon layer থেকে (STRtree, prepared geometry array)"""
+    geoms = np.asarray(geoms, dtype=object)
+    shapely.prepare(geoms)
+    return shapely.STRtree(geoms), geoms
+
+
+def query_join_tree(tree, lats, lons):
+    """
+    Bulk bbox query + prepared intersects_xy: (point index, polygon index) pair –
+    একটা point একাধিক polygon এ থাকতে পারে
+    """
+    strtree, geoms = tree
+    return query_prepared(strtree, geoms, lats, lons, test_xy=shapely.intersects_xy)
+
+
+def _join_worker_init(wkb):
+    global _join_tree
+    _join_tree = build_join_tree(shapely.from_wkb(wkb))
+
+
+def _join_worker_chunk(args):
+    offset, lats, lons = args
+    pt_idx, poly_idx = query_join_tree(_join_tree, lats, lons)
+    return pt_idx + offset, poly_idx
+
+
+def spatial_join_points(layer_gdf):
+    """
+    Point store এর প্রতিটা point কে layer এর polygon(গুলো) তে assign করি।
+    return: (point index array, polygon index array) – point index = points list এর position
+    """
+    lats = np.fromiter((p["lat"] for p in points), dtype="float64", count=len(points))
+    lons = np.fromiter((p["lon"] for p in points), dtype="float64", count=len(points))
+    geoms = layer_gdf.geometry.values
+
+    if len(points) < JOIN_PROCESS_THRESHOLD:
+        return query_join_tree(build_join_tree(geoms), lats, lons)
+
+    chunks = [
+        (start, lats[start:start + JOIN_CHUNK_SIZE], lons[start:start + JOIN_CHUNK_SIZE])
+        for start in range(0, len(points), JOIN_CHUNK_SIZE)
+    ]
+
+    with ProcessPoolExecutor(
+        max_workers=JOIN_WORKERS,
+        mp_context=JOIN_MP_CONTEXT,
+        initializer=_join_worker_init,
+        initargs=(shapely.to_wkb(geoms),)
+    ) as pool:
+        results = list(pool.map(_join_worker_chunk, chunks))
+
+    pt_idx = np.concatenate([r[0] for r in results])
+    poly_idx = np.concatenate([r[1] for r in results])
+    return pt_idx, poly_idx
+
+
+@app.route("/download_points_join_csv")
+def download_points_join_csv():
+    """প্রতিটা (point, polygon) মিলের একটা row – কোনো polygon এ না পড়া point বাদ"""
+    if "user_phone" not in session:
+        return redirect(url_for("login"))
+
+    if shapefile_gdf is None:
+        return "No shapefile loaded"
+
+    if not points:
+        return "No points loaded"
+
+    try:
+        pt_idx, poly_idx = spatial_join_points(shapefile_gdf)
+    except Exception as e:
+        print("Spatial join error:", e)
+        return "Error running spatial join", 500
+
+    out = io.StringIO()
+    wr = csv.writer(out)
+    wr.writerow(["PointId", "Latitude", "Longitude", "InsideIndia", "Source", "FeatureIndex"])
+
+    for i, j in zip(pt_idx.tolist(), poly_idx.tolist()):
+        p = points[i]
+        wr.writerow([
+            p["id"],
+            p["lat"],
+            p["lon"],
+            "Yes" if p["inside"] else "No",
+            p["source"],
+            j
+        ])
+
+    return Response(
+        out.getvalue(),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=points_in_polygons.csv"}
+    )
+
+
+# ===================== MULTI-FORMAT EXPORT (GPKG / GeoParquet / FGB / GeoJSONSeq / SHP) =====================
+
+# format key -> (OGR driver, file extension, mimetype); driver None = GeoParquet (pyarrow)
+EXPORT_FORMATS = {
+    "gpkg": ("GPKG", ".gpkg", "application/geopackage+sqlite3"),
+    "parquet": (None, ".parquet", "application/vnd.apache.parquet"),
+    "fgb": ("FlatGeobuf", ".fgb", "application/octet-stream"),
+    "geojsonl": ("GeoJSONSeq", ".geojsonl", "application/geo+json-seq"),
+    "shp": ("ESRI Shapefile", ".zip", "application/zip"),
+}
+
+# point store থেকে এই কলামগুলো export হবে (+ region level গুলো)
+POINT_EXPORT_COLUMNS = ["lat", "lon", "inside", "source", "created_at"] + REGION_LEVELS
+# dedup "flag" mode এ চালালে তবেই আসে – কোনো point এ না থাকলে export এ বাদ
+POINT_OPTIONAL_COLUMNS = ["duplicate"]
+
+EXPORT_CHUNK_SIZE = 1024 * 1024          # response এ 1 MB করে stream
+EXPORT_SPOOL_MAX = 64 * 1024 * 1024      # এর বেশি হলে spooled file disk এ যাবে
+
+
+def points_to_gdf():
+    """points list থেকে column-wise GeoDataFrame বানাই (EPSG:4326)"""
+    df = pd.DataFrame.from_records(points, columns=POINT_EXPORT_COLUMNS + POINT_OPTIONAL_COLUMNS)
+    empty = [c for c in POINT_OPTIONAL_COLUMNS if df[c].isna().all()]
+    df = df.drop(columns=empty)
+    return gpd.GeoDataFrame(
+        df,
+        geometry=gpd.points_from_xy(df["lon"], df["lat"]),
+        crs="EPSG:4326"
+    )
+
+
+def stream_file(fileobj, cleanup_dir=None):
+    """file object থেকে chunk করে পড়ে response এ পাঠাই, শেষে temp dir মুছে দিই"""
+    try:
+        fileobj.seek(0)
+        while True:
+            chunk = fileobj.read(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
+        if cleanup_dir:
+            shutil.rmtree(cleanup_dir, ignore_errors=True)
+
+
+def write_export(gdf, fmt, layer_name):
+    """
+    gdf কে চাওয়া format এ লিখি।
+    return: (file object, temp dir বা None) – caller stream_file() দিয়ে পাঠাবে
+    """
+    driver, ext, _ = EXPORT_FORMATS[fmt]
+
+    # GeoParquet সরাসরি spooled file এ (disk এ temp file লাগে না)
+    if driver is None:
+        spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX)
+        gdf.to_parquet(spool, index=False, compression="zstd")
+        return spool, None
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        if fmt == "shp":
+            shp_folder = os.path.join(tmp_dir, "shp")
+            os.makedirs(shp_folder, exist_ok=True)
+            gdf.to_file(
+                os.path.join(shp_folder, f"{layer_name}.shp"),
+                driver=driver,
+                engine="pyogrio",
+                use_arrow=True,
+                encoding="utf-8"
+            )
+
+            spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX)
+            with zipfile.ZipFile(spool, "w", zipfile.ZIP_DEFLATED) as zipf:
+                for f in os.listdir(shp_folder):
+                    zipf.write(os.path.join(shp_folder, f), arcname=f)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return spool, None
+
+        out_path = os.path.join(tmp_dir, layer_name + ext)
+        gdf.to_file(
+            out_path,
+            driver=driver,
+            layer=layer_name,
+            engine="pyogrio",
+            use_arrow=True
+        )
+        return open(out_path, "rb"), tmp_dir
+
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+@app.route("/export")
+def export_data():
+    """
+    /export?dataset=points|layer&format=gpkg|parquet|fgb|geojsonl|shp
+    points = সব point store, layer = current uploaded shapefile/KML layer
+    """
+    if "user_phone" not in session:
+        return redirect(url_for("login"))
+
+    dataset = request.args.get("dataset", "points")
+    fmt = request.args.get("format", "gpkg").lower()
+
+    if fmt not in EXPORT_FORMATS:
+        return f"format must be one of: {', '.join(EXPORT_FORMATS)}", 400
+
+    if dataset == "points":
+        if not points:
+            return "No points to export"
+        gdf = points_to_gdf()
+        layer_name = "points"
+    elif dataset == "layer":
+        if shapefile_gdf is None:
+            return "No shapefile loaded"
+        gdf = shapefile_gdf
+        layer_name = "layer"
+    else:
+        return "dataset must be 'points' or 'layer'", 400
+
+    try:
+        fileobj, tmp_dir = write_export(gdf, fmt, layer_name)
+    except Exception as e:
+        print("Export error:", e)
+        return "Failed to export data", 500
+
+    _, ext, mimetype = EXPORT_FORMATS[fmt]
+
+    return Response(
+        stream_file(fileobj, tmp_dir),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition":
+            f"attachment; filename={layer_name}_export{ext}"
+        }
+    )
+
+
 # ===================== WEATHER API ROUTE (Open-Meteo, NO KEY) =====================
 
+OPEN_METEO_URL = os.environ.get("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+OVERPASS_URL = os.environ.get("OVERPASS_URL", "https://overpass-api.de/api/interpreter")
+
 WEATHER_CODE_MAP = {
     0: "Clear sky",
     1: "Mainly clear",
@@ -753,15 +2288,18 @@ def api_weather():
     if lat is None or lon is None:
         return jsonify({"error": "lat and lon are required"}), 400
 
+    started = resp = None
     try:
-        url = "https://api.open-meteo.com/v1/forecast"
+        url = OPEN_METEO_URL
         params = {
             "latitude": lat,
             "longitude": lon,
             "current_weather": "true",
             "timezone": "auto",
         }
+        started = time.perf_counter()
         resp = requests.get(url, params=params, timeout=5)
+        record_upstream("open_meteo", resp, time.perf_counter() - started)
         print("Open-Meteo status:", resp.status_code)
 
         if resp.status_code != 200:
@@ -791,6 +2329,9 @@ def api_weather():
         return jsonify(result)
 
     except Exception as e:
+        # response ই আসেনি (timeout / connection error) – সেটাও metric এ যায়
+        if started is not None and resp is None:
+            record_upstream("open_meteo", None, time.perf_counter() - started)
         print("Weather API error (exception):", e)
         return jsonify({"error": "Failed to fetch weather."}), 500
 
@@ -842,10 +2383,13 @@ def download_buffer_pois():
     out center;
     """
 
+    started = resp = None
     try:
-        url = "https://overpass-api.de/api/interpreter"
+        url = OVERPASS_URL
 
+        started = time.perf_counter()
         resp = requests.post(url, data=overpass_query, timeout=120)
+        record_upstream("overpass", resp, time.perf_counter() - started)
 
         print("Overpass status:", resp.status_code)
 
@@ -910,6 +2454,9 @@ def download_buffer_pois():
         )
 
     except Exception as e:
+        # response ই আসেনি (timeout / connection error) – সেটাও metric এ যায়
+        if started is not None and resp is None:
+            record_upstream("overpass", None, time.perf_counter() - started)
         print("ERROR:", e)
         return "Failed to download POI data", 500
 